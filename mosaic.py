@@ -1,53 +1,335 @@
 
+import codecs
+import contextlib
+import io
+import mmap
+import struct
+
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+import numpy as np
+
+# Above this many items the plot methods draw in the faster, simplified style
+# unless told otherwise
+_SIMPLIFY_THRESHOLD = 500
+
+# Collection settings for the simplified style: no anti-aliasing, snapped to pixels
+_SIMPLIFIED_STYLE = {'antialiaseds': False, 'snap': True}
+
+# Text encodings whose bytes for the section phrases and numbers are plain
+# ASCII, so text files in them can be searched directly once memory-mapped
+_MAPPABLE_ENCODINGS = ('ascii', 'utf-8', 'iso8859-1', 'cp1252')
+
+# Marks the start of a section written in binary rather than text. The marker is
+# followed by the section's starting phrase, then each of its arrays as a
+# little-endian int64 row count and the raw little-endian rows.
+_BINARY_MAGIC = b"MOSAICB1"
+
+
+def _write_binary_section(file, header, *arrays):
+    """Write a binary section holding the given 2D arrays to a file opened in binary mode."""
+    parts = [_BINARY_MAGIC, header]
+    for arr in arrays:
+        parts.append(struct.pack('<q', len(arr)))
+        parts.append(np.ascontiguousarray(arr).tobytes())
+    file.write(b"".join(parts))
+
+
+def _read_section(file, header, footer, layout):
+    """
+    Read a text or binary section starting at the file's current position.
+
+    Returns (body, arrays). For a text section body is the raw bytes between the
+    starting and ending phrases, with line endings normalised to "\n", and arrays
+    is None; for a binary section body is None and arrays holds one array per
+    entry of layout. The file is left positioned just after the section. Real
+    files are memory-mapped so the ending phrase is found with a single search
+    rather than line by line.
+
+    Args:
+        file: An open file positioned at the start of the section.
+        header (bytes): The starting phrase, including its newline.
+        footer (bytes): The ending phrase, including its newline.
+        layout (list): A (dtype, width) pair for each array of a binary section.
+    """
+    try:
+        encoding = getattr(file, 'encoding', None)
+        if encoding is not None and codecs.lookup(encoding).name not in _MAPPABLE_ENCODINGS:
+            raise ValueError(f"Cannot search {encoding} text as raw bytes")
+        start = file.tell()
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        base = 0
+    except (AttributeError, OSError, ValueError):
+        # Not backed by a mappable file (e.g. io.StringIO, an empty file, a text
+        # file that has been iterated over so its position is unknown, or one in
+        # an encoding that is not ASCII-compatible)
+        if isinstance(file, io.TextIOBase):
+            return _read_text_section(file, header, footer), None
+        start = file.tell()
+        buffer = file.read()
+        base, start = start, 0
+
+    try:
+        if buffer[start:start + len(_BINARY_MAGIC)] == _BINARY_MAGIC:
+            body = None
+            arrays, end = _read_binary_arrays(buffer, start + len(_BINARY_MAGIC), header, layout)
+        else:
+            # Accept files written with Windows (CRLF) line endings too
+            crlf = buffer[start:start + len(header) + 1] == header[:-1] + b"\r\n"
+            if crlf:
+                header = header[:-1] + b"\r\n"
+                footer = footer[:-1] + b"\r\n"
+            if buffer[start:start + len(header)] != header:
+                raise ValueError(f"File does not start with '{header.decode().strip()}'")
+            arrays = None
+            body_start = start + len(header)
+            body_end = buffer.find(footer, body_start)
+            if body_end < 0:
+                # No ending phrase, so the section runs to the end of the file
+                body_end = end = len(buffer)
+            else:
+                end = body_end + len(footer)
+            body = buffer[body_start:body_end]
+            if crlf:
+                body = body.replace(b"\r\n", b"\n")
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    file.seek(base + end)
+    return body, arrays
+
+
+def _read_text_section(file, header, footer):
+    """Read a text section line by line from a stream that cannot be memory-mapped."""
+    header = header.decode()
+    footer = footer.decode()
+
+    # Check for the starting phrase
+    if file.readline().replace("\r\n", "\n") != header:
+        raise ValueError(f"File does not start with '{header.strip()}'")
+
+    # Read lines until the ending phrase is encountered
+    lines = []
+    for line in iter(file.readline, ""):
+        line = line.replace("\r\n", "\n")
+        if line == footer:
+            break  # Stop reading when the ending phrase is found
+        lines.append(line)
+    return "".join(lines).encode()
+
+
+def _read_binary_arrays(buffer, pos, header, layout):
+    """Read the arrays of a binary section from buffer, returning them and the end offset."""
+    if buffer[pos:pos + len(header)] != header:
+        raise ValueError(f"Binary section is not '{header.decode().strip()}'")
+    pos += len(header)
+    arrays = []
+    for dtype, width in layout:
+        dtype = np.dtype(dtype)
+        if pos + 8 > len(buffer):
+            raise ValueError(f"Truncated binary section '{header.decode().strip()}': missing row count")
+        (count,) = struct.unpack_from('<q', buffer, pos)
+        pos += 8
+        nbytes = count * width * dtype.itemsize
+        if count < 0 or pos + nbytes > len(buffer):
+            raise ValueError(f"Truncated binary section '{header.decode().strip()}': "
+                             f"expected {nbytes} bytes of rows, found {max(len(buffer) - pos, 0)}")
+        # Copy the rows out as bytes so nothing still refers to the buffer when it is closed
+        data = buffer[pos:pos + nbytes]
+        arrays.append(np.frombuffer(data, dtype=dtype).reshape(count, width).copy())
+        pos += nbytes
+    return arrays, pos
+
+
+def _parse_rows(text, dtype, width):
+    """Parse comma-separated rows of numbers into an (N, width) array."""
+    if not text.strip():
+        return np.empty((0, width), dtype=dtype)
+    return np.loadtxt(io.BytesIO(text), delimiter=',', dtype=dtype, ndmin=2)
+
+
+def _validate_tri(a, b, c):
+    """Return True if three (start, end) segments form a closed triangle."""
+    return a[1] == b[0] and b[1] == c[0] and c[1] == a[0]
+
+
+def _validate_quad(a, b, c, d):
+    """Return True if four (start, end) segments form a closed quadrilateral."""
+    return a[1] == b[0] and b[1] == c[0] and c[1] == d[0] and d[1] == a[0]
+
 
 class PointCollection:
     def __init__(self):
-        self.points = []  # List of (x, y) points
+        # The points are stored as separate contiguous x and y arrays, grown by
+        # doubling; only the first self._n entries of each are in use
+        self._x = np.empty(0, dtype=np.float64)
+        self._y = np.empty(0, dtype=np.float64)
+        self._n = 0
         self.ax = None  # Matplotlib axis, initially None
         self.box = None  # Bounding rectangle, initially None
+        self._xy_cache = None  # Dense (N, 2) points array, built when first needed
+        self._batching = False  # True between begin_batch() and end_batch()
+        self._mmap = None  # Backing np.memmap if opened with open_mmap()
+
+    @classmethod
+    def open_mmap(cls, path, n, mode='r+'):
+        """
+        Return a PointCollection backed by a memory-mapped file of n (x, y) doubles.
+
+        The points are paged in and out by the operating system, so collections
+        larger than memory can be used. xy_array is the memory map itself. Change
+        points in place with set_point(), then call flush() to write the changes
+        back to the file. Adding, removing or
+        reading points copies them into ordinary memory and detaches the
+        collection from the file, after which flush() raises ValueError.
+
+        Args:
+            path (str): The file holding the points as n rows of two float64 values.
+            n (int): The number of points in the file.
+            mode (str): The np.memmap mode; use 'w+' to create a new file.
+        """
+        collection = cls()
+        xy = np.memmap(path, dtype=np.float64, mode=mode, shape=(n, 2))
+        collection._mmap = xy
+        collection._x = xy[:, 0]
+        collection._y = xy[:, 1]
+        collection._n = n
+        collection._xy_cache = xy
+        return collection
+
+    def flush(self):
+        """Write any changes to a memory-mapped collection back to its file."""
+        if self._mmap is None:
+            raise ValueError("Points are not backed by a memory-mapped file")
+        self._mmap.flush()
+
+    def set_point(self, index, x, y):
+        """Move the point at index to (x, y) in place and invalidate the bounding box."""
+        if not 0 <= index < self._n:
+            raise IndexError("Index out of range")
+        self._x[index] = x
+        self._y[index] = y
+        self.box = None  # Invalidate the bounding box
+        if self._mmap is None:
+            self._xy_cache = None  # Invalidate the dense points array (a memory map is updated in place)
+
+    @property
+    def points(self):
+        """Return the points as a list of (x, y) tuples."""
+        return list(zip(self._x[:self._n].tolist(), self._y[:self._n].tolist()))
+
+    @property
+    def xy_array(self):
+        """
+        Return the points as an (N, 2) array, cached until the points change.
+
+        Treat the array as read-only; use set_point() to move a point, so that the
+        cached bounding box is invalidated.
+        """
+        if self._xy_cache is None:
+            self._xy_cache = np.column_stack((self._x[:self._n], self._y[:self._n]))
+        return self._xy_cache
+
+    def __len__(self):
+        """Return the number of points in the collection."""
+        return self._n
 
     def add_point(self, x, y):
         """Add a point to the collection and invalidate the bounding box."""
-        self.points.append((x, y))
-        self.box = None  # Invalidate the bounding box
+        if self._n == len(self._x):
+            # Arrays full, so double their capacity
+            capacity = max(2 * self._n, 1)
+            self._x = np.resize(self._x, capacity)
+            self._y = np.resize(self._y, capacity)
+            self._mmap = None  # The points now live in memory, not the mapped file
+        self._x[self._n] = x
+        self._y[self._n] = y
+        self._n += 1
+        if not self._batching:
+            self.box = None  # Invalidate the bounding box
+        self._xy_cache = None  # Invalidate the dense points array
 
     def remove_point(self, x, y):
         """Remove a point from the collection and invalidate the bounding box."""
-        self.points = [point for point in self.points if point != (x, y)]
+        xs = self._x[:self._n]
+        ys = self._y[:self._n]
+        keep = (xs != x) | (ys != y)
+        self._x = xs[keep]
+        self._y = ys[keep]
+        self._n = len(self._x)
+        self._mmap = None  # The points now live in memory, not the mapped file
         self.box = None  # Invalidate the bounding box
+        self._xy_cache = None  # Invalidate the dense points array
 
     def remove_point_by_index(self, index):
         """Remove a point by its index in the list and invalidate the bounding box."""
-        if 0 <= index < len(self.points):
-            self.points.pop(index)
+        if 0 <= index < self._n:
+            self._x = np.delete(self._x[:self._n], index)
+            self._y = np.delete(self._y[:self._n], index)
+            self._n -= 1
+            self._mmap = None  # The points now live in memory, not the mapped file
             self.box = None  # Invalidate the bounding box
+            self._xy_cache = None  # Invalidate the dense points array
         else:
             raise IndexError("Index out of range")
 
-    def write_to_file(self, file):
-        """Write the points to an already open file, with context strings."""
-        file.write("Mosaic Points:\n")  # Write the starting phrase
-        for point in self.points:
-            file.write(f"{point[0]},{point[1]}\n")
-        file.write("End of points.\n")  # Write the ending phrase
+    def begin_batch(self):
+        """
+        Start adding many points at once.
+
+        Until end_batch() is called the bounding box is not invalidated by each
+        add_point(), so get_bounding_rectangle() and get_plot() may use an out of
+        date box. Prefer the batch() context manager, which always ends the batch.
+        """
+        self._batching = True
+
+    def end_batch(self):
+        """Finish a batch of additions, invalidating the bounding box and redrawing the plot once."""
+        self._batching = False
+        self.box = None  # Invalidate the bounding box
+        if self.ax is not None:
+            self.ax.figure.canvas.draw_idle()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager that wraps begin_batch() and end_batch(), ending the batch even on error."""
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def write_to_file(self, file, binary=False):
+        """
+        Write the points to an already open file, with context strings.
+
+        If binary is true the points are written as raw little-endian doubles,
+        and the file must have been opened in binary mode.
+        """
+        if binary:
+            xy = np.column_stack((self._x[:self._n], self._y[:self._n])).astype('<f8')
+            _write_binary_section(file, b"Mosaic Points:\n", xy)
+            return
+
+        # Format the whole section first, then write it in one call
+        lines = [f"{x},{y}\n" for x, y in self.points]
+        file.write("Mosaic Points:\n" + "".join(lines) + "End of points.\n")
 
     def read_from_file(self, file):
-        """Read points from an already open file, checking for context strings."""
-        self.points = []  # Clear existing points
+        """Read points (text or binary) from an already open file, checking for context strings."""
         self.box = None  # Invalidate the bounding box
+        self._xy_cache = None  # Invalidate the dense points array
 
-        # Check for the starting phrase
-        first_line = file.readline()
-        if first_line != "Mosaic Points:\n":
-            raise ValueError("File does not start with 'Mosaic Points:'")
+        # Parse everything between the starting and ending phrases in one go
+        body, arrays = _read_section(file, b"Mosaic Points:\n", b"End of points.\n", [('<f8', 2)])
+        arr = arrays[0] if arrays is not None else _parse_rows(body, np.float64, 2)
 
-        # Read points until the ending phrase is encountered
-        for line in file:
-            if line == "End of points.\n":
-                break  # Stop reading when the ending phrase is found
-            x, y = map(float, line.strip().split(','))
-            self.points.append((x, y))
+        # Replace the existing points
+        self._x = arr[:, 0].copy()
+        self._y = arr[:, 1].copy()
+        self._n = len(arr)
+        self._mmap = None  # The points now live in memory, not the mapped file
 
     def __str__(self):
         """Return a string representation of the points."""
@@ -58,26 +340,16 @@ class PointCollection:
         if self.box is not None:
             return self.box  # Return cached bounding box
 
-        if not self.points:
+        if not self._n:
             raise ValueError("No points in the collection")
 
-        # Initialize min and max values with the first point
-        x_min = x_max = self.points[0][0]
-        y_min = y_max = self.points[0][1]
-
-        # Find the min and max x and y values
-        for x, y in self.points:
-            if x < x_min:
-                x_min = x
-            if x > x_max:
-                x_max = x
-            if y < y_min:
-                y_min = y
-            if y > y_max:
-                y_max = y
+        # Find the min and max x and y values with vectorised reductions
+        # over the used part of the arrays
+        x = self._x[:self._n]
+        y = self._y[:self._n]
 
         # Cache the bounding box
-        self.box = (x_min, y_min, x_max, y_max)
+        self.box = (float(x.min()), float(y.min()), float(x.max()), float(y.max()))
         return self.box
 
     def get_plot(self):
@@ -117,70 +389,98 @@ class PointCollection:
 
 class LineSegmentCollection:
     def __init__(self):
-        self.segments = []  # List of tuples (start_index, end_index)
+        # Rows of (start_index, end_index), grown by doubling; only the first
+        # self._n rows are in use
+        self._arr = np.empty((0, 2), dtype=np.int32)
+        self._n = 0
+
+    @property
+    def segments(self):
+        """Return the line segments as an (N, 2) array of (start_index, end_index) rows."""
+        return self._arr[:self._n]
 
     def add_segment(self, start_index, end_index):
         """Add a line segment defined by the indices of two points."""
-        self.segments.append((start_index, end_index))
+        if self._n == len(self._arr):
+            # Array full, so double its capacity
+            self._arr = np.resize(self._arr, (max(2 * self._n, 1), 2))
+        self._arr[self._n] = (start_index, end_index)
+        self._n += 1
 
     def remove_segment(self, start_index, end_index):
         """Remove a line segment defined by the indices of two points."""
-        self.segments = [seg for seg in self.segments if seg != (start_index, end_index)]
+        segs = self.segments
+        keep = ~((segs[:, 0] == start_index) & (segs[:, 1] == end_index))
+        self._arr = segs[keep]
+        self._n = len(self._arr)
 
     def remove_segment_by_index(self, index):
         """Remove a line segment by its index in the list."""
-        if 0 <= index < len(self.segments):
-            self.segments.pop(index)
+        if 0 <= index < self._n:
+            self._arr = np.delete(self.segments, index, axis=0)
+            self._n -= 1
         else:
             raise IndexError("Index out of range")
 
-    def write_to_file(self, file):
-        """Write the line segments to an already open file, with context strings."""
-        file.write("Mosaic Line Segments:\n")  # Write the starting phrase
-        for seg in self.segments:
-            file.write(f"{seg[0]},{seg[1]}\n")
-        file.write("End of line segments.\n")  # Write the ending phrase
+    def write_to_file(self, file, binary=False):
+        """
+        Write the line segments to an already open file, with context strings.
+
+        If binary is true the segments are written as raw little-endian int32s,
+        and the file must have been opened in binary mode.
+        """
+        if binary:
+            _write_binary_section(file, b"Mosaic Line Segments:\n", self.segments.astype('<i4'))
+            return
+
+        # Format the whole section first, then write it in one call
+        lines = [f"{start},{end}\n" for start, end in self.segments.tolist()]
+        file.write("Mosaic Line Segments:\n" + "".join(lines) + "End of line segments.\n")
 
     def read_from_file(self, file, points):
-        """Read line segments from an already open file, checking for context strings."""
-        self.segments = []  # Clear existing segments
-
-        # Check for the starting phrase
-        first_line = file.readline()
-        if first_line != "Mosaic Line Segments:\n":
-            raise ValueError("File does not start with 'Mosaic Line Segments:'")
-
-        # Read segments until the ending phrase is encountered
-        for line in file:
-            if line == "End of line segments.\n":
-                break  # Stop reading when the ending phrase is found
-            start_index, end_index = map(int, line.strip().split(','))
-            # Validate that the indices are within the bounds of the points list
-            if start_index < 0 or start_index >= len(points) or end_index < 0 or end_index >= len(points):
-                raise ValueError("Invalid point index in line segment")
-            self.segments.append((start_index, end_index))
+        """Read line segments (text or binary) from an already open file, checking for context strings."""
+        # Parse everything between the starting and ending phrases in one go
+        body, arrays = _read_section(file, b"Mosaic Line Segments:\n", b"End of line segments.\n", [('<i4', 2)])
+        arr = arrays[0] if arrays is not None else _parse_rows(body, np.int64, 2)
+
+        # Validate that the indices are within the bounds of the points list
+        if ((arr < 0) | (arr >= len(points))).any():
+            raise ValueError("Invalid point index in line segment")
+
+        # Replace the existing segments
+        self._arr = arr.astype(np.int32)
+        self._n = len(self._arr)
 
     def __str__(self):
         """Return a string representation of the line segments."""
-        return "\n".join(f"({start}, {end})" for start, end in self.segments)
+        return "\n".join(f"({start}, {end})" for start, end in self.segments.tolist())
 
-    def plot_line_segments(self, points, ax):
+    def plot_line_segments(self, points, ax, simplify=None):
         """
         Open a graphics window with the same aspect ratio as the bounding rectangle
         of the points and plot all the line segments without axes or labels.
 
         Args:
             points (PointCollection): A PointCollection object containing the points.
-            segments (LineSegmentCollection): A LineSegmentCollection object containing the line segments.
+            ax: The matplotlib axis to plot on.
+            simplify (bool): Draw without anti-aliasing, snapped to whole pixels.
+                By default this is done only when there are many segments.
         """
-        # Get the bounding rectangle of the points
+        if not self._n:
+            return
+        if simplify is None:
+            simplify = self._n > _SIMPLIFY_THRESHOLD
+        style = _SIMPLIFIED_STYLE if simplify else {}
+
+        # Gather the endpoints of every segment into an (N, 2, 2) array
+        seg_idx = self.segments
+        xy = points.xy_array
+        segs = xy[seg_idx]
 
-        # Plot each line segment
-        for seg in self.segments:
-            start_index, end_index = seg
-            x_start, y_start = points.points[start_index]
-            x_end, y_end = points.points[end_index]
-            ax.plot([x_start, x_end], [y_start, y_end], marker='o', linestyle='-', color='b')
+        # Draw all the segments as one artist, and mark their endpoints with one scatter
+        ax.add_collection(LineCollection(segs, colors='b', linestyles='-', **style))
+        ends = np.unique(seg_idx)
+        ax.scatter(xy[ends, 0], xy[ends, 1], c='b', marker='o', zorder=2)
 
 
 class ShapeCollection:
@@ -190,70 +490,75 @@ class ShapeCollection:
 
     def add_triangle(self, seg1_index, seg2_index, seg3_index, segments, colour):
         """Add a triangle defined by three line segments, validating corner matching."""
-        if not self._validate_shape([seg1_index, seg2_index, seg3_index], segments):
+        if not _validate_tri(segments[seg1_index], segments[seg2_index], segments[seg3_index]):
             raise ValueError("Invalid triangle: segments do not form a closed shape")
         self.triangles.append((seg1_index, seg2_index, seg3_index, colour))
 
     def add_quadrilateral(self, seg1_index, seg2_index, seg3_index, seg4_index, segments, colour):
         """Add a quadrilateral defined by four line segments, validating corner matching."""
-        if not self._validate_shape([seg1_index, seg2_index, seg3_index, seg4_index], segments):
+        if not _validate_quad(segments[seg1_index], segments[seg2_index], segments[seg3_index],
+                              segments[seg4_index]):
             raise ValueError("Invalid quadrilateral: segments do not form a closed shape")
         self.quadrilaterals.append((seg1_index, seg2_index, seg3_index, seg4_index, colour))
 
-    def _validate_shape(self, segment_indices, segments):
-        """Validate that the segments form a closed shape (corners match)."""
-        # Get the segments from their indices
-        segment_list = [segments[i] for i in segment_indices]
-
-        # Check that the end of each segment matches the start of the next
-        for i in range(len(segment_list)):
-            current_seg = segment_list[i]
-            next_seg = segment_list[(i + 1) % len(segment_list)]
-            if current_seg[1] != next_seg[0]:
-                return False
-        return True
-
-    def write_to_file(self, file):
-        """Write the shapes to an already open file, with context strings."""
-        file.write("Mosaic Shapes:\n")  # Write the starting phrase
-        # Write triangles
-        file.write("Triangles:\n")
-        for triangle in self.triangles:
-            seg1, seg2, seg3, (r, g, b) = triangle
-            file.write(f"{seg1},{seg2},{seg3},{r},{g},{b}\n")
-        # Write quadrilaterals
-        file.write("Quadrilaterals:\n")
-        for quad in self.quadrilaterals:
-            seg1, seg2, seg3, seg4, (r, g, b) = quad
-            file.write(f"{seg1},{seg2},{seg3},{seg4},{r},{g},{b}\n")
-        file.write("End of shapes.\n")  # Write the ending phrase
+    def _shape_arrays(self):
+        """Return the triangles and quadrilaterals flattened to (N, 6) and (N, 7) int arrays."""
+        tri_arr = np.array([(*triangle[:3], *triangle[3]) for triangle in self.triangles],
+                           dtype=np.int64).reshape(-1, 6)
+        quad_arr = np.array([(*quad[:4], *quad[4]) for quad in self.quadrilaterals],
+                            dtype=np.int64).reshape(-1, 7)
+        return tri_arr, quad_arr
+
+    def write_to_file(self, file, binary=False):
+        """
+        Write the shapes to an already open file, with context strings.
+
+        If binary is true the shapes are written as raw little-endian int32s,
+        and the file must have been opened in binary mode.
+        """
+        if binary:
+            tri_arr, quad_arr = self._shape_arrays()
+            _write_binary_section(file, b"Mosaic Shapes:\n", tri_arr.astype('<i4'), quad_arr.astype('<i4'))
+            return
+
+        # Format the whole section first, then write it in one call
+        parts = ["Mosaic Shapes:\n", "Triangles:\n"]
+        parts += [f"{seg1},{seg2},{seg3},{r},{g},{b}\n" for seg1, seg2, seg3, (r, g, b) in self.triangles]
+        parts.append("Quadrilaterals:\n")
+        parts += [f"{seg1},{seg2},{seg3},{seg4},{r},{g},{b}\n"
+                  for seg1, seg2, seg3, seg4, (r, g, b) in self.quadrilaterals]
+        parts.append("End of shapes.\n")
+        file.write("".join(parts))
 
     def read_from_file(self, file, segments):
-        """Read shapes from an already open file, checking for context strings."""
+        """Read shapes (text or binary) from an already open file, checking for context strings."""
         self.triangles = []  # Clear existing triangles
         self.quadrilaterals = []  # Clear existing quadrilaterals
 
-        # Check for the starting phrase
-        first_line = file.readline()
-        if first_line != "Mosaic Shapes:\n":
-            raise ValueError("File does not start with 'Mosaic Shapes:'")
-
-        # Read shapes until the ending phrase is encountered
-        current_section = None
-        for line in file:
-            if line == "End of shapes.\n":
-                break  # Stop reading when the ending phrase is found
-            elif line == "Triangles:\n":
-                current_section = "Triangles"
-            elif line == "Quadrilaterals:\n":
-                current_section = "Quadrilaterals"
-            else:
-                if current_section == "Triangles":
-                    seg1, seg2, seg3, r, g, b = map(int, line.strip().split(','))
-                    self.triangles.append((seg1, seg2, seg3, (r, g, b)))
-                elif current_section == "Quadrilaterals":
-                    seg1, seg2, seg3, seg4, r, g, b = map(int, line.strip().split(','))
-                    self.quadrilaterals.append((seg1, seg2, seg3, seg4, (r, g, b)))
+        # Get everything between the starting and ending phrases
+        body, arrays = _read_section(file, b"Mosaic Shapes:\n", b"End of shapes.\n", [('<i4', 6), ('<i4', 7)])
+        if arrays is not None:
+            tri_arr, quad_arr = arrays
+        else:
+            # Split the body into its triangles and quadrilaterals subsections
+            tri_at = body.find(b"Triangles:\n")
+            quad_at = body.find(b"Quadrilaterals:\n")
+            tri_text = quad_text = b""
+            if tri_at >= 0:
+                tri_end = quad_at if quad_at > tri_at else len(body)
+                tri_text = body[tri_at + len(b"Triangles:\n"):tri_end]
+            if quad_at >= 0:
+                quad_end = tri_at if tri_at > quad_at else len(body)
+                quad_text = body[quad_at + len(b"Quadrilaterals:\n"):quad_end]
+
+            # Parse each subsection in one go
+            tri_arr = _parse_rows(tri_text, np.int64, 6)
+            quad_arr = _parse_rows(quad_text, np.int64, 7)
+
+        for seg1, seg2, seg3, r, g, b in tri_arr.tolist():
+            self.triangles.append((seg1, seg2, seg3, (r, g, b)))
+        for seg1, seg2, seg3, seg4, r, g, b in quad_arr.tolist():
+            self.quadrilaterals.append((seg1, seg2, seg3, seg4, (r, g, b)))
 
     def __str__(self):
         """Return a string representation of the shapes."""
@@ -263,26 +568,44 @@ class ShapeCollection:
         result += "\n".join(f"({seg1}, {seg2}, {seg3}, {seg4}, ({r}, {g}, {b}))" for seg1, seg2, seg3, seg4, (r, g, b) in self.quadrilaterals)
         return result
 
-    def plot_shapes(self, points, segments, ax):
-        """Plot triangles and quadrilaterals on the given matplotlib axis."""
-        # Plot triangles
-        for triangle in self.triangles:
-            seg1, seg2, seg3, (r, g, b) = triangle
-            # Get the points for each segment
-            x1, y1 = points.points[segments.segments[seg1][0]]
-            x2, y2 = points.points[segments.segments[seg1][1]]
-            x3, y3 = points.points[segments.segments[seg2][1]]
-            ax.fill([x1, x2, x3], [y1, y2, y3], color=(r/255, g/255, b/255), alpha=0.5)
-
-        # Plot quadrilaterals
-        for quad in self.quadrilaterals:
-            seg1, seg2, seg3, seg4, (r, g, b) = quad
-            # Get the points for each segment
-            x1, y1 = points.points[segments.segments[seg1][0]]
-            x2, y2 = points.points[segments.segments[seg1][1]]
-            x3, y3 = points.points[segments.segments[seg2][1]]
-            x4, y4 = points.points[segments.segments[seg3][1]]
-            ax.fill([x1, x2, x3, x4], [y1, y2, y3, y4], color=(r/255, g/255, b/255), alpha=0.5)
+    def plot_shapes(self, points, segments, ax, simplify=None):
+        """
+        Plot triangles and quadrilaterals on the given matplotlib axis.
+
+        If simplify is true the shapes are drawn without anti-aliasing, snapped to
+        whole pixels; by default this is done only when there are many shapes.
+        """
+        if simplify is None:
+            simplify = len(self.triangles) + len(self.quadrilaterals) > _SIMPLIFY_THRESHOLD
+        style = _SIMPLIFIED_STYLE if simplify else {}
+
+        xy = points.xy_array
+
+        # Start and end point index of every segment, looked up once per call
+        segs = segments.segments
+        seg_start = segs[:, 0]
+        seg_end = segs[:, 1]
+
+        # Plot triangles as a single collection
+        if self.triangles:
+            # Corner point indices of each triangle, shape (N, 3)
+            tri_seg = np.array([triangle[:3] for triangle in self.triangles])
+            corners = np.column_stack((seg_start[tri_seg[:, 0]], seg_end[tri_seg[:, 0]], seg_end[tri_seg[:, 1]]))
+            colours = np.array([colour for *_, colour in self.triangles], dtype=np.float32)
+            colours *= 1.0 / 255.0
+            vertices = xy[corners]
+            ax.add_collection(PolyCollection(vertices, facecolors=colours, edgecolors=colours, alpha=0.5, **style))
+
+        # Plot quadrilaterals as a single collection
+        if self.quadrilaterals:
+            # Corner point indices of each quadrilateral, shape (N, 4)
+            quad_seg = np.array([quad[:4] for quad in self.quadrilaterals])
+            corners = np.column_stack((seg_start[quad_seg[:, 0]], seg_end[quad_seg[:, 0]],
+                                       seg_end[quad_seg[:, 1]], seg_end[quad_seg[:, 2]]))
+            colours = np.array([colour for *_, colour in self.quadrilaterals], dtype=np.float32)
+            colours *= 1.0 / 255.0
+            vertices = xy[corners]
+            ax.add_collection(PolyCollection(vertices, facecolors=colours, edgecolors=colours, alpha=0.5, **style))
 
 if __name__ == "__main__":
     # Create a PointCollection and add points